@@ -0,0 +1,96 @@
+"""
+Shared helpers for the test scripts
+- Service instances built once per process instead of once per test function
+- Buffered test output and cheap failure reporting
+"""
+
+import io
+import os
+import sys
+import threading
+import traceback
+from functools import lru_cache, wraps
+
+
+def get_travel_ai():
+    """Shared TravelAI instance"""
+    from travel_ai import travel_ai
+    return travel_ai
+
+
+@lru_cache(maxsize=1)
+def get_search_service():
+    """Shared SearchService instance"""
+    from search_service import SearchService
+    return SearchService()
+
+
+@lru_cache(maxsize=1)
+def get_email_service():
+    """Shared EmailService instance"""
+    from email_service import EmailService
+    return EmailService()
+
+
+class _ThreadStdout:
+    """sys.stdout stand-in that sends each thread's writes to that thread's buffer, if it has one"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+    
+    def _target(self):
+        return getattr(_buffers, "current", None) or self._stream
+    
+    def write(self, text):
+        return self._target().write(text)
+    
+    def flush(self):
+        return self._target().flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+_buffers = threading.local()
+_stdout_lock = threading.Lock()
+_stdout_users = 0
+_real_stdout = None
+
+
+def buffered_output(test_func):
+    """Collect a test's print() output and write it in one go (DEBUG=1 prints as it goes)
+    Buffers are per thread, so tests run side by side don't mix their output"""
+    @wraps(test_func)
+    def wrapper(*args, **kwargs):
+        global _stdout_users, _real_stdout
+        if os.getenv("DEBUG") == "1":
+            return test_func(*args, **kwargs)
+        
+        with _stdout_lock:
+            if not _stdout_users:
+                _real_stdout = sys.stdout
+                sys.stdout = _ThreadStdout(_real_stdout)
+            _stdout_users += 1
+        
+        outer = getattr(_buffers, "current", None)
+        buf = _buffers.current = io.StringIO()
+        try:
+            return test_func(*args, **kwargs)
+        finally:
+            _buffers.current = outer
+            with _stdout_lock:
+                out = outer or _real_stdout
+                out.write(buf.getvalue())
+                out.flush()
+                _stdout_users -= 1
+                if not _stdout_users:
+                    sys.stdout = _real_stdout
+    return wrapper
+
+
+def print_traceback():
+    """Report the exception being handled - full traceback only with VERBOSE=1"""
+    if os.getenv("VERBOSE") == "1":
+        traceback.print_exc()
+    else:
+        print(f"   ({sys.exc_info()[0].__name__} - set VERBOSE=1 for the full traceback)")
@@ -12,8 +12,10 @@ from datetime import datetime
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import env_cache
+
 try:
-    from travel_ai import TravelAI
+    from travel_ai import travel_ai
     from search_service import SearchService
     from email_service import EmailService
     from models import TravelRequest
@@ -28,31 +30,21 @@ SESSIONS = {}
 
 class Handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         response = {
             "status": "healthy",
             "message": "Travel AI API is running",
             "modules_loaded": MODULES_LOADED,
             "endpoints": ["/api/chat"],
             "env_check": {
-                "smtp_email": bool(os.getenv('SMTP_EMAIL')),
-                "smtp_password": bool(os.getenv('SMTP_PASSWORD')),
-                "vercel": bool(os.getenv('VERCEL'))
+                "smtp_email": bool(env_cache.get('SMTP_EMAIL')),
+                "smtp_password": bool(env_cache.get('SMTP_PASSWORD')),
+                "vercel": bool(env_cache.get('VERCEL'))
             }
         }
         
-        self.wfile.write(json.dumps(response, default=str).encode())
+        self._send_json(response)
     
     def do_POST(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         if self.path == '/api/chat':
             try:
                 # Read request body
@@ -95,29 +87,36 @@ class Handler(BaseHTTPRequestHandler):
                 }
             }
         
-        self.wfile.write(json.dumps(response, default=str).encode())
+        self._send_json(response)
+    
+    def _send_json(self, response: dict):
+        """Write a 200 JSON reply with its Content-Length, so clients know the size up front"""
+        body = json.dumps(response, default=str).encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
     
     def process_travel_request(self, message: str, session_id: str) -> dict:
         """Process travel request with AI, search, and email"""
         try:
             # Debug: Check environment variables
-            import os
-            import sys
             debug_info = f"""
 🔍 ENVIRONMENT DEBUG - Session {session_id}
-SMTP_EMAIL: {'✅ Set' if os.getenv('SMTP_EMAIL') else '❌ Missing'}
-SMTP_PASSWORD: {'✅ Set' if os.getenv('SMTP_PASSWORD') else '❌ Missing'}
-VERCEL: {'✅ Yes' if os.getenv('VERCEL') else '❌ No'}
+SMTP_EMAIL: {'✅ Set' if env_cache.get('SMTP_EMAIL') else '❌ Missing'}
+SMTP_PASSWORD: {'✅ Set' if env_cache.get('SMTP_PASSWORD') else '❌ Missing'}
+VERCEL: {'✅ Yes' if env_cache.get('VERCEL') else '❌ No'}
 """
             print(debug_info, file=sys.stderr)
             sys.stderr.flush()
             
             # Initialize services
-            travel_ai = TravelAI()
             search_service = SearchService()
             
             # Force config refresh for Vercel
-            if os.getenv('VERCEL'):
+            if env_cache.get('VERCEL'):
                 from config import config
                 config.set('email.smtp_server', 'smtp.hostinger.com')
                 config.set('email.smtp_port', 465)
@@ -133,7 +132,7 @@ SMTP Server: {email_service.smtp_server}
 SMTP Port: {email_service.smtp_port}
 Sender Email: {'✅ Set' if email_service.sender_email else '❌ Missing'}
 Sender Password: {'✅ Set' if email_service.sender_password else '❌ Missing'}
-Config Source: {'Vercel' if os.getenv('VERCEL') else 'Local'}
+Config Source: {'Vercel' if env_cache.get('VERCEL') else 'Local'}
 """
             print(email_debug, file=sys.stderr)
             sys.stderr.flush()
@@ -2,14 +2,10 @@
 Configuration management for Travel Chatbot MVP
 """
 
-import os
 from typing import Optional
 from pathlib import Path
 import json
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+import env_cache
 
 
 class Config:
@@ -22,7 +18,7 @@ class Config:
     def _load_config(self) -> dict:
         """Load configuration from file or create default"""
         # In serverless environments, just return default config
-        if os.getenv('VERCEL') or os.getenv('AWS_LAMBDA_FUNCTION_NAME'):
+        if env_cache.get('VERCEL') or env_cache.get('AWS_LAMBDA_FUNCTION_NAME'):
             return self._get_default_config()
             
         if self.config_file.exists():
@@ -43,7 +39,8 @@ class Config:
         return {
             "openai": {
                 "model": "gpt-3.5-turbo",
-                "temperature": 0.1
+                "temperature": 0,
+                "max_tokens": 400
             },
             "email": {
                 "smtp_server": "smtp.hostinger.com",
@@ -56,6 +53,7 @@ class Config:
             },
             "chatbot": {
                 "session_timeout_hours": 24,
+                "max_sessions": 10000,
                 "max_conversation_history": 50,
                 "default_currency": "EUR"
             },
@@ -69,7 +67,7 @@ class Config:
     def _save_config(self, config: dict):
         """Save configuration to file"""
         # Skip saving in serverless environments (Vercel, etc.)
-        if os.getenv('VERCEL') or os.getenv('AWS_LAMBDA_FUNCTION_NAME'):
+        if env_cache.get('VERCEL') or env_cache.get('AWS_LAMBDA_FUNCTION_NAME'):
             return
             
         try:
@@ -110,7 +108,7 @@ class Config:
     def get_openai_api_key(self) -> Optional[str]:
         """Get OpenAI API key from environment or config"""
         # Priority: .env > config.json
-        api_key = os.getenv('OPENAI_API_KEY')
+        api_key = env_cache.get('OPENAI_API_KEY')
         if not api_key:
             api_key = self.get('openai.api_key')
         return api_key
@@ -120,16 +118,16 @@ class Config:
         return {
             'smtp_server': self.get('email.smtp_server', 'smtp.gmail.com'),
             'smtp_port': self.get('email.smtp_port', 587),
-            'email': os.getenv('SMTP_EMAIL') or self.get('email.email'),
-            'password': os.getenv('SMTP_PASSWORD') or self.get('email.password')
+            'email': env_cache.get('SMTP_EMAIL') or self.get('email.email'),
+            'password': env_cache.get('SMTP_PASSWORD') or self.get('email.password')
         }
     
     def get_flight_search_config(self) -> dict:
         """Get flight search configuration"""
         return {
             'use_mock': self.get('flight_search.use_mock', True),
-            'amadeus_api_key': os.getenv('AMADEUS_API_KEY') or self.get('flight_search.amadeus_api_key'),
-            'amadeus_api_secret': os.getenv('AMADEUS_API_SECRET') or self.get('flight_search.amadeus_api_secret'),
+            'amadeus_api_key': env_cache.get('AMADEUS_API_KEY') or self.get('flight_search.amadeus_api_key'),
+            'amadeus_api_secret': env_cache.get('AMADEUS_API_SECRET') or self.get('flight_search.amadeus_api_secret'),
             'max_results': self.get('flight_search.max_results', 5)
         }
     
@@ -0,0 +1,16 @@
+"""
+Environment snapshot
+.env is parsed once per process; every read after that is a plain dict lookup
+"""
+
+import os
+from pathlib import Path
+from dotenv import dotenv_values
+
+# Real environment variables win over .env, same precedence as load_dotenv()
+_ENV = {**dotenv_values(Path(__file__).parent / '.env'), **os.environ}
+
+
+def get(name: str, default=None):
+    """Read a variable from the snapshot (empty values count as unset)"""
+    return _ENV.get(name) or default
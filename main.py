@@ -4,26 +4,30 @@ FastAPI backend for AI-powered travel booking chatbot
 
 API Endpoints:
 - POST /api/chat - Process chat messages
+- POST /api/chat/stream - Process chat messages, streamed as server-sent events
 - GET /api/health - Health check
 - DELETE /api/session/{session_id} - Clear session
 - GET /api/config/status - Configuration status
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
-from travel_ai import TravelAI
+from travel_ai import travel_ai
 from search_service import SearchService
 from email_service import EmailService
 from gmail_auth import CustomerGmailLogin
 from models import TravelRequest
 from config import config
+from cachetools import TTLCache
+from contextlib import asynccontextmanager
+import orjson
 import uuid
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import threading
+import env_cache
 
 # Pydantic models for API
 class ChatRequest(BaseModel):
@@ -43,11 +47,18 @@ class ConfigStatusResponse(BaseModel):
     amadeus_configured: bool
     email_configured: bool
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the service singletons once per worker, before serving traffic"""
+    app.state.api = await run_in_threadpool(TravelBookingAPI)
+    yield
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Travel Booking AI API",
     description="AI-powered travel booking chatbot API for remote workers",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for frontend integration
@@ -66,40 +77,108 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Chat replies for a finished request
+_SUCCESS_TMPL = """🎉 Perfect! I found a great travel package for you:
+
+{summary}
+
+📧 I've sent the complete details with booking links to {email}
+
+Ready to plan another trip? Just tell me where you'd like to go next!"""
+
+_FAILURE_TMPL = """😔 I couldn't find any travel packages matching your criteria:
+
+📍 Route: {origin} → {destination}
+📅 Date: {date}
+👥 Travelers: {passengers}
+{budget_line}
+
+📧 I've sent this information to {email}
+
+Try adjusting your criteria or different dates. Want to search again?"""
+
 class TravelBookingAPI:
     """API wrapper for Travel Booking AI"""
     
     def __init__(self):
-        self.ai = TravelAI()
+        self.ai = travel_ai
         self.search = SearchService()
         self.email = EmailService()
         self.customer_login = CustomerGmailLogin()
-        self.sessions = {}
+        # Bounded session store - idle sessions expire instead of piling up
+        self.sessions = TTLCache(
+            maxsize=config.get('chatbot.max_sessions', 10000),
+            ttl=config.get('chatbot.session_timeout_hours', 24) * 3600
+        )
+        # cachetools caches aren't thread-safe and messages run in the threadpool
+        self._lock = threading.Lock()
     
     def process_message(self, user_id: str, message: str) -> dict:
         """Process user message and return response"""
         
         # Get current session
-        current_request = self.sessions.get(user_id)
+        with self._lock:
+            current_request = self.sessions.get(user_id)
         
         # Extract information and generate follow-up questions
         ai_result = self.ai.extract_travel_info(message, current_request)
+        return self._apply_extraction(user_id, ai_result)
+    
+    async def process_message_async(self, user_id: str, message: str) -> dict:
+        """process_message for the event loop - the OpenAI call is awaited instead of blocking a thread"""
+        with self._lock:
+            current_request = self.sessions.get(user_id)
+        
+        ai_result = await self.ai.extract_travel_info_async(message, current_request)
+        # Searching and emailing still block
+        return await run_in_threadpool(self._apply_extraction, user_id, ai_result)
+    
+    async def stream_message(self, user_id: str, message: str):
+        """
+        process_message as server-sent events
+        "delta" events carry follow-up question text as the model writes it, then a single
+        "message" event carries the same payload /api/chat returns - or an "error" event if
+        processing failed after the stream had started
+        """
+        try:
+            with self._lock:
+                current_request = self.sessions.get(user_id)
+            
+            ai_result = None
+            async for event, payload in iterate_in_threadpool(self.ai.stream_travel_info(message, current_request)):
+                if event == "text_delta":
+                    yield b"event: delta\ndata: " + orjson.dumps(payload) + b"\n\n"
+                else:
+                    ai_result = payload
+            
+            response = await run_in_threadpool(self._apply_extraction, user_id, ai_result)
+            yield b"event: message\ndata: " + orjson.dumps({"response": response, "session_id": user_id}) + b"\n\n"
+        
+        except Exception as e:
+            # The 200 is already on the wire, so the failure has to be reported in-stream
+            print(f"❌ Streamed chat error: {e}")
+            yield b"event: error\ndata: " + orjson.dumps({"detail": "Internal server error"}) + b"\n\n"
+    
+    def _apply_extraction(self, user_id: str, ai_result: dict) -> dict:
+        """Update the session from an extraction result and build the reply"""
         
         # Auto-fill email if customer is logged in
         if self.customer_login.is_logged_in() and not ai_result["travel_request"].user_email:
             ai_result["travel_request"].user_email = self.customer_login.get_customer_email()
+            ai_result["complete"], ai_result["missing"] = ai_result["travel_request"]._scan_required()
         
         # Update session
-        self.sessions[user_id] = ai_result["travel_request"]
+        with self._lock:
+            self.sessions[user_id] = ai_result["travel_request"]
         
         # Check if we have all required information
-        if ai_result["is_complete"] and ai_result["travel_request"].is_complete():
+        if ai_result["complete"]:
             return self._handle_complete_request(user_id, ai_result["travel_request"])
         else:
             # Return follow-up question
             follow_up = ai_result.get("follow_up_question")
             if not follow_up:
-                follow_up = self.ai.generate_follow_up_question(ai_result["travel_request"])
+                follow_up = self.ai.generate_follow_up_question(ai_result["travel_request"], ai_result["missing"])
             
             return {
                 "type": "question",
@@ -107,6 +186,11 @@ class TravelBookingAPI:
                 "session_id": user_id
             }
     
+    def clear_session(self, user_id: str):
+        """Forget a user's conversation state"""
+        with self._lock:
+            self.sessions.pop(user_id, None)
+    
     def _handle_complete_request(self, user_id: str, request: TravelRequest) -> dict:
         """Handle complete travel request"""
         
@@ -120,47 +204,40 @@ class TravelBookingAPI:
         email_sent = self.email.send_travel_package(request, package)
         
         # Clear session
-        if user_id in self.sessions:
-            del self.sessions[user_id]
+        self.clear_session(user_id)
         
         # Return response
         if package:
-            response = f"""
-🎉 Perfect! I found a great travel package for you:
-
-{package.format_summary()}
-
-📧 I've sent the complete details with booking links to {request.user_email}
-
-Ready to plan another trip? Just tell me where you'd like to go next!
-            """
+            response = _SUCCESS_TMPL.format(
+                summary=package.format_summary(),
+                email=request.user_email
+            )
         else:
-            response = f"""
-😔 I couldn't find any travel packages matching your criteria:
-
-📍 Route: {request.origin} → {request.destination}
-📅 Date: {request.departure_date.strftime('%B %d, %Y')}
-👥 Travelers: {request.passengers}
-{f'💰 Budget: €{request.budget}' if request.budget else ''}
-
-📧 I've sent this information to {request.user_email}
-
-Try adjusting your criteria or different dates. Want to search again?
-            """
+            response = _FAILURE_TMPL.format(
+                origin=request.origin,
+                destination=request.destination,
+                date=request.departure_date.strftime('%B %d, %Y'),
+                passengers=request.passengers,
+                budget_line=f"💰 Budget: €{request.budget}" if request.budget else "",
+                email=request.user_email
+            )
         
         return {
             "type": "complete",
-            "message": response.strip(),
+            "message": response,
             "session_id": user_id,
             "package": package.to_dict() if package else None,
             "email_sent": email_sent
         }
 
-# Initialize the API
-api = TravelBookingAPI()
+def get_api(request: Request) -> TravelBookingAPI:
+    """Return the TravelBookingAPI created at startup"""
+    return request.app.state.api
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+# The reply is built by our own code, so it goes out as pre-encoded orjson bytes instead of
+# through response_model validation or jsonable_encoder; ChatResponse still documents the shape
+@app.post("/api/chat", response_model=None, responses={200: {"model": ChatResponse}})
+async def chat(request: ChatRequest, api: TravelBookingAPI = Depends(get_api)):
     """Handle chat messages"""
     try:
         message = request.message.strip()
@@ -172,17 +249,26 @@ async def chat(request: ChatRequest):
         if not session_id:
             session_id = str(uuid.uuid4())
         
-        # Process the message
-        response = api.process_message(session_id, message)
+        response = await api.process_message_async(session_id, message)
         
-        return ChatResponse(
-            response=response,
-            session_id=session_id
-        )
+        return Response(orjson.dumps({
+            "response": response,
+            "session_id": session_id
+        }), media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, api: TravelBookingAPI = Depends(get_api)):
+    """Handle chat messages, streaming the follow-up question while the model writes it"""
+    message = request.message.strip()
+    if not message:
+        raise HTTPException(status_code=400, detail="Message is required")
+    
+    session_id = request.session_id or str(uuid.uuid4())
+    return StreamingResponse(api.stream_message(session_id, message), media_type="text/event-stream")
+
 @app.get("/api/health", response_model=HealthResponse)
 async def health():
     """Health check endpoint"""
@@ -192,10 +278,9 @@ async def health():
     )
 
 @app.delete("/api/session/{session_id}")
-async def clear_session(session_id: str):
+async def clear_session(session_id: str, api: TravelBookingAPI = Depends(get_api)):
     """Clear a user session"""
-    if session_id in api.sessions:
-        del api.sessions[session_id]
+    api.clear_session(session_id)
     return {"message": "Session cleared"}
 
 @app.get("/api/config/status", response_model=ConfigStatusResponse)
@@ -230,4 +315,11 @@ if __name__ == "__main__":
     print("📡 API: http://localhost:8000")
     print("📚 Docs: http://localhost:8000/docs")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # Auto-reload only in development - the file watcher rules out multiple workers.
+    # Sessions live in each worker's memory and uvicorn doesn't route a conversation back to
+    # the same worker, so stay on one worker unless WEB_CONCURRENCY asks for more (e.g. behind
+    # a proxy with sticky sessions).
+    debug = env_cache.get("DEBUG") == "1"
+    workers = 1 if debug else int(env_cache.get("WEB_CONCURRENCY", 1))
+    
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=debug, workers=workers) 
\ No newline at end of file
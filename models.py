@@ -3,10 +3,20 @@ Data models for the Travel Booking Platform
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from dataclasses import dataclass, field, asdict
+from typing import Optional, List, Tuple, ClassVar
 from datetime import date
 from enum import Enum
 
+# City names (lowercase) the airport lookup knows without asking Amadeus
+CITY_CODES = {
+    "porto": "OPO", "london": "LON", "paris": "PAR", "madrid": "MAD",
+    "barcelona": "BCN", "rome": "ROM", "amsterdam": "AMS", "berlin": "BER",
+    "new york": "NYC", "nyc": "NYC", "los angeles": "LAX", "lisbon": "LIS",
+    "frankfurt": "FRA", "munich": "MUC", "milan": "MIL", "zurich": "ZRH",
+    "vienna": "VIE", "prague": "PRG", "budapest": "BUD", "dublin": "DUB"
+}
+
 
 class TravelRequest(BaseModel):
     """Main travel request containing all trip information"""
@@ -24,30 +34,27 @@ class TravelRequest(BaseModel):
     # Preferences
     budget: Optional[float] = Field(None, description="Total budget in EUR")
     
+    # Fields that must be filled before we can search
+    _REQUIRED: ClassVar[Tuple[str, ...]] = ("origin", "destination", "departure_date", "user_email")
+    
+    def _scan_required(self) -> Tuple[bool, Tuple[str, ...]]:
+        """Check required fields in one pass, returning (complete, missing)"""
+        missing = tuple(name for name in self._REQUIRED if not getattr(self, name))
+        return not missing, missing
+    
     def is_complete(self) -> bool:
         """Check if all required fields are filled"""
-        return all([
-            self.origin,
-            self.destination, 
-            self.departure_date,
-            self.user_email
-        ])
+        return self._scan_required()[0]
     
     def missing_fields(self) -> List[str]:
         """Return list of missing required fields"""
-        missing = []
-        if not self.origin:
-            missing.append("origin")
-        if not self.destination:
-            missing.append("destination")
-        if not self.departure_date:
-            missing.append("departure_date")
-        if not self.user_email:
-            missing.append("user_email")
-        return missing
+        return list(self._scan_required()[1])
 
 
-class FlightOption(BaseModel):
+# Search results are built by our own parsing code, so they use slotted
+# dataclasses rather than validated Pydantic models
+@dataclass(slots=True, kw_only=True)
+class FlightOption:
     """Flight search result"""
     airline: str
     flight_number: str
@@ -60,7 +67,8 @@ class FlightOption(BaseModel):
     booking_url: Optional[str] = None
 
 
-class AccommodationOption(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class AccommodationOption:
     """Accommodation search result"""
     name: str
     type: str  # hotel, apartment, hostel, etc.
@@ -68,11 +76,12 @@ class AccommodationOption(BaseModel):
     price_per_night: float
     total_price: float
     currency: str = "EUR"
-    amenities: List[str] = []
+    amenities: List[str] = field(default_factory=list)
     booking_url: Optional[str] = None
 
 
-class TravelPackage(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class TravelPackage:
     """Complete travel package with flight and accommodation"""
     flight: Optional[FlightOption] = None
     accommodation: Optional[AccommodationOption] = None
@@ -100,8 +109,8 @@ class TravelPackage(BaseModel):
     def to_dict(self) -> dict:
         """Convert package to dictionary for API response"""
         return {
-            "flight": self.flight.dict() if self.flight else None,
-            "accommodation": self.accommodation.dict() if self.accommodation else None,
+            "flight": asdict(self.flight) if self.flight else None,
+            "accommodation": asdict(self.accommodation) if self.accommodation else None,
             "total_price": self.total_price,
             "currency": self.currency
         } 
\ No newline at end of file
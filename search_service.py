@@ -3,12 +3,23 @@ Search Service - Handles flight and accommodation search
 Step 5: Search for best flights and accommodations using Amadeus API
 """
 
+import re
+import threading
 import requests
-from typing import List, Optional
-from datetime import datetime, timedelta
-from models import TravelRequest, FlightOption, AccommodationOption, TravelPackage
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Future
+from models import TravelRequest, FlightOption, AccommodationOption, TravelPackage, CITY_CODES
 from config import config
 
+# ISO 8601 durations as returned by Amadeus, e.g. "PT2H30M"
+_DUR_RE = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?")
+
+# Ranking weights (EUR) for picking the best flight among the offers
+_STOP_PENALTY = 25.0
+_MINUTE_PENALTY = 0.25
+
 
 class SearchService:
     """Service for searching flights and accommodations"""
@@ -20,6 +31,25 @@ class SearchService:
         self.base_url = "https://test.api.amadeus.com"
         self.access_token = None
         self.use_mock = flight_config.get('use_mock', True)
+        self.max_results = flight_config.get('max_results', 5)
+        
+        # Keep-alive session so auth + search reuse the same TLS connection
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = "travelchatbot/1.0"
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False  # Hand the last response back to our status checks
+            )
+        ))
+        
+        # Identical searches in flight right now, so concurrent callers share one HTTP call
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
     
     def search_best_package(self, request: TravelRequest) -> Optional[TravelPackage]:
         """
@@ -63,7 +93,7 @@ class SearchService:
             return False
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/v1/security/oauth2/token",
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
                 data={
@@ -92,69 +122,92 @@ class SearchService:
             params = {
                 "originLocationCode": self._get_airport_code(request.origin),
                 "destinationLocationCode": self._get_airport_code(request.destination),
-                "departureDate": request.departure_date.strftime("%Y-%m-%d"),
+                "departureDate": request.departure_date.isoformat(),
                 "adults": request.passengers,
                 "currencyCode": "EUR",
-                "max": 1  # Only get 1 option as specified
+                "max": self.max_results  # Ranked locally, only the best is returned
             }
             
             if request.return_date:
-                params["returnDate"] = request.return_date.strftime("%Y-%m-%d")
-            
-            response = requests.get(
-                f"{self.base_url}/v2/shopping/flight-offers",
-                headers={"Authorization": f"Bearer {self.access_token}"},
-                params=params,
-                timeout=10  # 10 second timeout
-            )
+                params["returnDate"] = request.return_date.isoformat()
             
-            if response.status_code == 200:
-                data = response.json()
-                flights = data.get("data", [])
+            # Pick the cheapest offer once stops and travel time are priced in
+            best_flight, best_score = None, None
+            for flight_data in self._fetch_flight_offers(params):
+                parsed = self._parse_flight(flight_data, request)
+                if not parsed:
+                    continue  # Unparseable or over budget
                 
-                if flights:
-                    flight_data = flights[0]  # Get the first (best) option
-                    return self._parse_flight(flight_data, request)
+                flight, minutes = parsed
+                score = self._score_flight(flight, minutes)
+                if best_score is None or score < best_score:
+                    best_flight, best_score = flight, score
             
-            return None
+            return best_flight
             
         except Exception as e:
             print(f"❌ Flight search error: {e}")
             return None
     
+    def _fetch_flight_offers(self, params: dict) -> List[dict]:
+        """Fetch raw Amadeus flight offers, coalescing identical concurrent searches"""
+        key = tuple(sorted(params.items()))
+        
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._inflight[key] = Future()
+        
+        # Someone else is already running this exact search - wait for their result
+        if not is_leader:
+            return future.result()
+        
+        try:
+            response = self._session.get(
+                f"{self.base_url}/v2/shopping/flight-offers",
+                headers={"Authorization": f"Bearer {self.access_token}"},
+                params=params,
+                timeout=10  # 10 second timeout
+            )
+            offers = response.json().get("data", []) if response.status_code == 200 else []
+            future.set_result(offers)
+            return offers
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
     def _search_accommodation(self, request: TravelRequest) -> Optional[AccommodationOption]:
         """Search for best accommodation option"""
         # Note: Amadeus has hotel search API, but for MVP we'll use mock data
         # In production, integrate with Booking.com, Expedia, etc.
         return self._get_mock_accommodation(request)
     
-    def _parse_flight(self, flight_data: dict, request: TravelRequest) -> FlightOption:
-        """Parse Amadeus flight data into FlightOption"""
+    def _parse_flight(self, flight_data: dict, request: TravelRequest) -> Optional[Tuple[FlightOption, int]]:
+        """Parse Amadeus flight data into a FlightOption and its travel time in minutes"""
         try:
-            itineraries = flight_data.get("itineraries", [])
-            if not itineraries:
-                return None
-            
-            outbound = itineraries[0]
-            segments = outbound.get("segments", [])
-            
-            if not segments:
-                return None
-            
+            # Amadeus always sends these keys - index directly and treat gaps as a bad offer
+            outbound = flight_data["itineraries"][0]
+            segments = outbound["segments"]
             first_segment = segments[0]
             last_segment = segments[-1]
             
             # Extract flight details
-            carrier_code = first_segment.get("carrierCode", "XX")
-            flight_number = first_segment.get("number", "0000")
+            carrier_code = first_segment["carrierCode"]
+            flight_number = first_segment["number"]
             
-            departure_time = first_segment.get("departure", {}).get("at", "")[-8:-3]
-            arrival_time = last_segment.get("arrival", {}).get("at", "")[-8:-3]
+            # Timestamps are "YYYY-MM-DDTHH:MM:SS"
+            departure_time = first_segment["departure"]["at"][11:16]
+            arrival_time = last_segment["arrival"]["at"][11:16]
             
-            duration = outbound.get("duration", "PT2H0M")
-            duration = duration.replace("PT", "").replace("H", "h ").replace("M", "m")
+            match = _DUR_RE.match(outbound.get("duration", "PT2H0M"))
+            hours, minutes = (int(group or 0) for group in match.groups()) if match else (0, 0)
+            duration = f"{hours}h {minutes}m"
             
-            price = float(flight_data.get("price", {}).get("total", 0))
+            price = float(flight_data["price"]["total"])
             stops = len(segments) - 1
             
             # Apply budget filter
@@ -170,22 +223,22 @@ class SearchService:
                 price=price,
                 stops=stops,
                 booking_url=f"https://www.amadeus.com/flights?offer={flight_data.get('id', '')}"
-            )
+            ), hours * 60 + minutes
             
+        except (KeyError, IndexError) as e:
+            print(f"❌ Incomplete flight offer: {e!r}")
+            return None
         except Exception as e:
             print(f"❌ Flight parsing error: {e}")
             return None
     
+    def _score_flight(self, flight: FlightOption, minutes: int) -> float:
+        """Rank a flight offer - lower is better"""
+        return flight.price + _STOP_PENALTY * flight.stops + _MINUTE_PENALTY * minutes
+    
     def _get_airport_code(self, city: str) -> str:
         """Map city names to airport codes"""
-        city_codes = {
-            "porto": "OPO", "london": "LON", "paris": "PAR", "madrid": "MAD",
-            "barcelona": "BCN", "rome": "ROM", "amsterdam": "AMS", "berlin": "BER",
-            "new york": "NYC", "nyc": "NYC", "los angeles": "LAX", "lisbon": "LIS",
-            "frankfurt": "FRA", "munich": "MUC", "milan": "MIL", "zurich": "ZRH",
-            "vienna": "VIE", "prague": "PRG", "budapest": "BUD", "dublin": "DUB"
-        }
-        return city_codes.get(city.lower(), city.upper()[:3])
+        return CITY_CODES.get(city.lower(), city.upper()[:3])
     
     def _get_mock_package(self, request: TravelRequest) -> TravelPackage:
         """Generate mock travel package for testing"""
@@ -5,6 +5,7 @@ Tests the API directly without deploying to Vercel
 """
 
 import json
+import orjson
 import sys
 import os
 from io import BytesIO
@@ -13,12 +14,12 @@ from http.server import BaseHTTPRequestHandler
 # Add the current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import our API handler
-from api.index import Handler
-
 def test_api_handler():
     """Test the API handler with a mock request"""
     
+    # Import our API handler here - it pulls in the AI, search and email services
+    from api.index import Handler
+    
     # Create a mock request
     class MockRequest:
         def __init__(self, path, method, body=None):
@@ -33,13 +34,13 @@ def test_api_handler():
         def __init__(self):
             self.status_code = None
             self.headers = {}
-            self.body = b''
+            self.body = BytesIO()  # Amortized appends, unlike bytes +=
         
         def write(self, data):
-            self.body += data
+            self.body.write(data)
         
         def getvalue(self):
-            return self.body.decode('utf-8')
+            return self.body.getvalue().decode('utf-8')
     
     # Test data
     test_message = "Book a trip from Porto to London next weekend for 3 days under 500 euros. My email is test@example.com"
@@ -75,19 +76,20 @@ def test_api_handler():
         response_data = json.loads(mock_response.getvalue())
         
         print("✅ API Response:")
-        print(json.dumps(response_data, indent=2))
+        print(orjson.dumps(response_data, option=orjson.OPT_INDENT_2).decode())
         
         # Check response structure
         if 'session_id' in response_data and 'response' in response_data:
             response = response_data['response']
-            print(f"\n📊 Response Type: {response.get('type', 'unknown')}")
+            rtype = response.get('type', 'unknown')
+            print(f"\n📊 Response Type: {rtype}")
             print(f"💬 Message: {response.get('message', 'No message')}")
             
-            if response.get('type') == 'success':
+            if rtype == 'success':
                 print("🎉 SUCCESS: API is working correctly!")
-            elif response.get('type') == 'question':
+            elif rtype == 'question':
                 print("❓ QUESTION: API is asking for more info")
-            elif response.get('type') == 'error':
+            elif rtype == 'error':
                 print("❌ ERROR: API encountered an error")
             else:
                 print("⚠️ UNKNOWN: Unexpected response type")
@@ -96,8 +98,8 @@ def test_api_handler():
             
     except Exception as e:
         print(f"❌ ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        from _fixtures import print_traceback
+        print_traceback()
 
 if __name__ == "__main__":
     test_api_handler() 
\ No newline at end of file
@@ -11,6 +11,13 @@ import os
 # Add the current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from _fixtures import buffered_output
+
+def public_methods(obj):
+    """List the public methods defined on obj's class"""
+    return [name for name, value in vars(type(obj)).items() if not name.startswith('_') and callable(value)]
+
+@buffered_output
 def test_core_functions():
     """Test the core functions used by the API"""
     
@@ -25,16 +32,13 @@ def test_core_functions():
     try:
         # Test 1: Import modules
         print("🔍 Step 1: Testing imports...")
-        from travel_ai import TravelAI
-        from search_service import SearchService
-        from email_service import EmailService
-        from models import TravelRequest
+        from _fixtures import get_travel_ai, get_search_service, get_email_service
         print("✅ All modules imported successfully")
         print()
         
         # Test 2: TravelAI extraction
         print("🔍 Step 2: Testing TravelAI extraction...")
-        travel_ai = TravelAI()
+        travel_ai = get_travel_ai()
         extraction_result = travel_ai.extract_travel_info(test_message)
         print(f"✅ Extraction result: {extraction_result}")
         print()
@@ -43,7 +47,7 @@ def test_core_functions():
         if extraction_result.get('is_complete', False):
             print("🔍 Step 3: Testing SearchService...")
             travel_request = extraction_result['travel_request']
-            search_service = SearchService()
+            search_service = get_search_service()
             
             # Check if search_best_package method exists
             if hasattr(search_service, 'search_best_package'):
@@ -51,7 +55,7 @@ def test_core_functions():
                 print(f"✅ Search result: {search_result}")
             else:
                 print("⚠️ search_best_package method not found, checking available methods...")
-                methods = [method for method in dir(search_service) if not method.startswith('_')]
+                methods = public_methods(search_service)
                 print(f"Available methods: {methods}")
                 search_result = None
             print()
@@ -59,7 +63,7 @@ def test_core_functions():
             # Test 4: Email service
             if search_result:
                 print("🔍 Step 4: Testing EmailService...")
-                email_service = EmailService()
+                email_service = get_email_service()
                 
                 # Check if send_travel_package method exists with correct signature
                 if hasattr(email_service, 'send_travel_package'):
@@ -70,7 +74,7 @@ def test_core_functions():
                         print(f"⚠️ Email error: {e}")
                 else:
                     print("⚠️ send_travel_package method not found")
-                    methods = [method for method in dir(email_service) if not method.startswith('_')]
+                    methods = public_methods(email_service)
                     print(f"Available methods: {methods}")
             print()
             
@@ -84,8 +88,8 @@ def test_core_functions():
         print(f"❌ Import error: {e}")
     except Exception as e:
         print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        from _fixtures import print_traceback
+        print_traceback()
 
 if __name__ == "__main__":
     test_core_functions() 
\ No newline at end of file
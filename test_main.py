@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for the FastAPI backend in main.py
+The AI service is replaced with a canned stream, so no OpenAI key is needed
+"""
+
+import orjson
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+
+
+def _question_result():
+    """Extraction result that still needs a destination"""
+    from models import TravelRequest
+
+    return {
+        "travel_request": TravelRequest(origin="Porto"),
+        "complete": False,
+        "missing": ("destination", "departure_date", "user_email"),
+        "follow_up_question": "Where would you like to go?"
+    }
+
+
+async def _fake_extract(message, current_request):
+    """Stand-in for TravelAI.extract_travel_info_async"""
+    return _question_result()
+
+
+def _fake_stream(message, current_request):
+    """Stand-in for TravelAI.stream_travel_info"""
+    yield "text_delta", "Where would you "
+    yield "text_delta", "like to go?"
+    yield "result", _question_result()
+
+
+def _events(body: str):
+    """Split a server-sent event stream into (event, data) pairs"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((fields["event"], orjson.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """TestClient with the app's TravelBookingAPI wired to the canned AI replies"""
+    import main
+
+    with TestClient(main.app) as client:
+        api = main.app.state.api
+        monkeypatch.setattr(api, "ai", SimpleNamespace(
+            extract_travel_info_async=_fake_extract,
+            stream_travel_info=_fake_stream
+        ))
+        monkeypatch.setattr(api, "customer_login", SimpleNamespace(is_logged_in=lambda: False))
+        yield client
+
+
+def test_chat(client):
+    """The follow-up question comes back as JSON and the partial request is kept"""
+    import main
+    from models import TravelRequest
+
+    response = client.post("/api/chat", json={"message": "from Porto", "session_id": "c1"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {
+        "response": {"type": "question", "message": "Where would you like to go?", "session_id": "c1"},
+        "session_id": "c1"
+    }
+    assert main.app.state.api.sessions["c1"] == TravelRequest(origin="Porto")
+
+
+def test_chat_complete(client, monkeypatch):
+    """A complete request is searched, emailed and then dropped from the sessions"""
+    import main
+    from datetime import date
+    from models import TravelRequest
+
+    trip = TravelRequest(
+        origin="Porto", destination="London", departure_date=date(2026, 11, 6),
+        user_email="test@example.com"
+    )
+
+    async def extract(message, current_request):
+        return {"travel_request": trip, "complete": True, "missing": (), "follow_up_question": None}
+
+    api = main.app.state.api
+    api.sessions["c2"] = TravelRequest(origin="Porto", destination="London")
+    monkeypatch.setattr(api.ai, "extract_travel_info_async", extract)
+    monkeypatch.setattr(api, "search", SimpleNamespace(search_best_package=lambda request: None))
+    monkeypatch.setattr(api, "email", SimpleNamespace(send_travel_package=lambda request, package: False))
+
+    response = client.post("/api/chat", json={"message": "on Nov 6, test@example.com", "session_id": "c2"})
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["session_id"] == "c2"
+    assert body["response"]["type"] == "complete"
+    assert body["response"]["package"] is None
+    assert body["response"]["email_sent"] is False
+    assert "Porto → London" in body["response"]["message"]
+    assert "c2" not in api.sessions
+
+
+def test_chat_stream(client):
+    """Question text arrives as delta events, then the full response"""
+    response = client.post("/api/chat/stream", json={"message": "from Porto", "session_id": "s1"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _events(response.text) == [
+        ("delta", "Where would you "),
+        ("delta", "like to go?"),
+        ("message", {
+            "response": {"type": "question", "message": "Where would you like to go?", "session_id": "s1"},
+            "session_id": "s1"
+        })
+    ]
+
+
+def test_chat_stream_error(client, monkeypatch):
+    """A failure after streaming has started ends the stream with an error event"""
+    import main
+
+    def fail(user_id, ai_result):
+        raise RuntimeError("search backend down")
+    monkeypatch.setattr(main.app.state.api, "_apply_extraction", fail)
+
+    response = client.post("/api/chat/stream", json={"message": "from Porto", "session_id": "s2"})
+
+    events = _events(response.text)
+    assert [event for event, _ in events] == ["delta", "delta", "error"]
+    assert events[-1][1] == {"detail": "Internal server error"}
+
+
+def test_chat_stream_requires_message(client):
+    """Blank messages are rejected before any streaming starts"""
+    assert client.post("/api/chat/stream", json={"message": "   "}).status_code == 400
@@ -4,14 +4,23 @@ Test script for Travel AI functionality
 Tests: Text extraction → Flight search → Email sending
 """
 
-import os
+import json
 import sys
+import pytest
 from datetime import date
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from env_cache import get as envget
+from _fixtures import buffered_output
 
-# Load environment variables
-load_dotenv()
+# Messages used by the extraction tests
+_TEST_CASES = (
+    "I want to go from Porto to London next weekend for 3 days under 500 euros",
+    "Book a flight from Paris to Rome on December 15th for 1 week",
+    "Find me a hotel in Madrid for 2 nights, budget 200 euros",
+    "Travel from NYC to Paris next month for 5 days",
+)
 
+@buffered_output
 def test_travel_ai_workflow():
     """Test the complete travel AI workflow"""
     
@@ -29,10 +38,10 @@ def test_travel_ai_workflow():
         print("🔍 Step 1: Testing TravelAI (Text Extraction)")
         print("-" * 40)
         
-        from travel_ai import TravelAI
+        from _fixtures import get_travel_ai
         from models import TravelRequest
         
-        ai = TravelAI()
+        ai = get_travel_ai()
         print("✅ TravelAI imported successfully")
         
         # Test text extraction
@@ -53,9 +62,9 @@ def test_travel_ai_workflow():
         print("🔍 Step 2: Testing SearchService (Flight & Accommodation)")
         print("-" * 40)
         
-        from search_service import SearchService
+        from _fixtures import get_search_service
         
-        search = SearchService()
+        search = get_search_service()
         print("✅ SearchService imported successfully")
         
         # Search for travel package
@@ -81,9 +90,9 @@ def test_travel_ai_workflow():
         print("📧 Step 3: Testing EmailService (Email Sending)")
         print("-" * 40)
         
-        from email_service import EmailService
+        from _fixtures import get_email_service
         
-        email = EmailService()
+        email = get_email_service()
         print("✅ EmailService imported successfully")
         
         # Send travel package
@@ -110,8 +119,8 @@ def test_travel_ai_workflow():
         print("   pip install -r requirements.txt")
     except Exception as e:
         print(f"❌ Test failed: {e}")
-        import traceback
-        traceback.print_exc()
+        from _fixtures import print_traceback
+        print_traceback()
 
 def test_simple_extraction():
     """Test just the text extraction part"""
@@ -119,25 +128,22 @@ def test_simple_extraction():
     print("🧪 Testing Simple Text Extraction")
     print("=" * 40)
     
-    test_cases = [
-        "I want to go from Porto to London next weekend for 3 days under 500 euros",
-        "Book a flight from Paris to Rome on December 15th for 1 week",
-        "Find me a hotel in Madrid for 2 nights, budget 200 euros",
-        "Travel from NYC to Paris next month for 5 days"
-    ]
-    
     try:
-        from travel_ai import TravelAI
+        from _fixtures import get_travel_ai
         
-        ai = TravelAI()
+        ai = get_travel_ai()
         print("✅ TravelAI loaded successfully")
         print()
         
-        for i, message in enumerate(test_cases, 1):
+        # Each extraction is an OpenAI round-trip, so run them concurrently
+        with ThreadPoolExecutor(max_workers=len(_TEST_CASES)) as executor:
+            futures = [executor.submit(ai.extract_travel_info, message) for message in _TEST_CASES]
+        
+        for i, (message, future) in enumerate(zip(_TEST_CASES, futures), 1):
             print(f"📝 Test {i}: {message}")
             
             try:
-                result = ai.extract_travel_info(message)
+                result = future.result()
                 request = result["travel_request"]
                 
                 print(f"   📍 {request.origin} → {request.destination}")
@@ -154,13 +160,128 @@ def test_simple_extraction():
     except Exception as e:
         print(f"❌ Test failed: {e}")
 
+@pytest.mark.skipif(not envget('OPENAI_API_KEY'), reason="OPENAI_API_KEY not set")
+@pytest.mark.parametrize("message", _TEST_CASES)
+def test_extraction(message):
+    """Extract one message - one case per test so pytest-xdist can spread them out"""
+    from _fixtures import get_travel_ai
+    
+    result = get_travel_ai().extract_travel_info(message)
+    request = result["travel_request"]
+    
+    print(f"📝 {message}")
+    print(f"   📍 {request.origin} → {request.destination}")
+    print(f"   📅 {request.departure_date}")
+    print(f"   ✅ Complete: {request.is_complete()}")
+    assert "extracted_info" in result, "extraction fell back to the error response"
+
+# Model replies _extract_json has to read - braces and escapes inside strings, fences and prose around
+_REPLY_OBJECT = {"follow_up_question": 'Prefer "{window}" or aisle? \\o/', "extracted_info": {"origin": "Porto", "tags": ["}", "{"]}}
+_REPLY_JSON = json.dumps(_REPLY_OBJECT)
+_JSON_REPLIES = (_REPLY_JSON, f"```json\n{_REPLY_JSON}\n```\n", f"Here you go:\n{_REPLY_JSON} Let me know!")
+
+@pytest.mark.parametrize("reply", _JSON_REPLIES)
+def test_extract_json(reply):
+    """Outermost object is found despite fences, prose and braces inside strings"""
+    from travel_ai import TravelAI
+    
+    assert TravelAI._extract_json(reply) == _REPLY_OBJECT
+
+@pytest.mark.parametrize("reply", ("no json here", '{"origin": "Porto"'))
+def test_extract_json_errors(reply):
+    """Replies without a complete object raise ValueError, which extraction turns into the fallback"""
+    from travel_ai import TravelAI
+    
+    with pytest.raises(ValueError):
+        TravelAI._extract_json(reply)
+
+# Streamed replies for _StreamParser, with the follow-up text it should emit along the way
+_STREAM_CASES = (
+    # Escapes, including ones the parser has to decode itself
+    ('{"extracted_info": {"origin": "Porto"}, "follow_up_question": "Say \\"when\\"\\\\now\\n\\tand\\/or later?", "confidence": 0.9}',
+     'Say "when"\\now\n\tand/or later?'),
+    # \u escapes, with a surrogate pair for a character outside the BMP
+    ('{"follow_up_question": "\\u2708\\ufe0f Lisboa \\u00e9 \\ud83d\\ude00?", "is_complete": false}', "✈️ Lisboa é 😀?"),
+    # Raw non-ASCII text
+    ('{"follow_up_question": "Où partez-vous? 🧳", "missing_fields": ["origin"]}', "Où partez-vous? 🧳"),
+    # No question
+    ('{"extracted_info": {"origin": null}, "follow_up_question": null, "confidence": 0.5}', ""),
+    # Same key nested deeper - only the top-level one is the question
+    ('{"extracted_info": {"follow_up_question": "not this", "notes": ["follow_up_question"]}, "follow_up_question": "this"}', "this"),
+    # Fences and prose around the object
+    ('Sure!\n```json\n{"follow_up_question": "When? {soon}", "missing_fields": []}\n```\nAnything else?', "When? {soon}"),
+)
+
+def _run_stream_parser(chunks):
+    """Feed chunks through a fresh _StreamParser, returning (follow-up text, parsed object)"""
+    from travel_ai import _StreamParser
+    
+    parser = _StreamParser()
+    text, parsed = [], []
+    for chunk in chunks:
+        for event, payload in parser.feed(chunk):
+            if event == "text_delta":
+                text.append(payload)
+            else:
+                parsed.append(payload)
+    assert len(parsed) == 1, "stream_end should be emitted exactly once"
+    return "".join(text), parsed[0]
+
+@pytest.mark.parametrize("reply, question", _STREAM_CASES)
+def test_stream_parser(reply, question):
+    """Same question text and object however the reply is split into chunks (no OpenAI needed)"""
+    from travel_ai import TravelAI
+    
+    expected = TravelAI._extract_json(reply)
+    
+    for cut in range(len(reply) + 1):
+        assert _run_stream_parser((reply[:cut], reply[cut:])) == (question, expected), f"split at {cut}"
+    assert _run_stream_parser(reply) == (question, expected), "one character per chunk"
+
+# Fast-path cases: the request so far, the user's reply, and the fields the reply should fill
+# (None when the model has to be asked instead)
+_DATED_TRIP = dict(origin="Porto", destination="Rome", departure_date=date(2025, 12, 1))
+_FAST_PATH_CASES = (
+    (_DATED_TRIP, "bob@x.com", {"user_email": "bob@x.com"}),
+    (_DATED_TRIP, "My email is bob@x.com, we are 3 people", {"user_email": "bob@x.com", "passengers": 3}),
+    (dict(origin="Porto", user_email="bob@x.com", departure_date=date(2025, 12, 1)), "to Paris", {"destination": "Paris"}),
+    (dict(origin="Porto", destination="Rome", user_email="bob@x.com"), "2025-12-10", {"departure_date": date(2025, 12, 10)}),
+    # Would overwrite a field the user already gave
+    (_DATED_TRIP, "bob@x.com 2025-12-10", None),
+    (_DATED_TRIP, "to Paris bob@x.com", None),
+    (dict(_DATED_TRIP, budget=500), "bob@x.com, 800 euros", None),
+    # Not plainly an answer
+    (_DATED_TRIP, "change to Paris, bob@x.com", None),
+    (dict(departure_date=date(2025, 12, 1), user_email="bob@x.com"), "Paris", None),
+    (dict(origin="Porto", destination="Rome", user_email="bob@x.com"), "2025-13-40", None),
+)
+
+@pytest.mark.parametrize("current, message, expected", _FAST_PATH_CASES)
+def test_fast_extract(current, message, expected):
+    """Regex fast path only fills missing fields, never replaces ones already set (no OpenAI needed)"""
+    from _fixtures import get_travel_ai
+    from models import TravelRequest
+    
+    result = get_travel_ai()._fast_extract(message, TravelRequest(**current))
+    
+    if expected is None:
+        assert result is None
+        return
+    
+    assert result is not None and result["complete"]
+    request = result["travel_request"]
+    for field, value in expected.items():
+        assert getattr(request, field) == value
+    for field, value in current.items():
+        assert getattr(request, field) == value
+
 if __name__ == "__main__":
     print("🚀 Travel AI Test Suite")
     print("=" * 50)
     print()
     
     # Check if OpenAI API key is set
-    if not os.getenv('OPENAI_API_KEY'):
+    if not envget('OPENAI_API_KEY'):
         print("❌ OPENAI_API_KEY not found in environment")
         print("💡 Add it to your .env file or set it as an environment variable")
         print()
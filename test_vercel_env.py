@@ -3,8 +3,7 @@
 Test to check environment variables in Vercel-like conditions
 """
 
-import os
-from dotenv import load_dotenv
+import env_cache
 
 def test_vercel_env():
     """Test environment variables like Vercel would see them"""
@@ -12,13 +11,13 @@ def test_vercel_env():
     print("=" * 50)
     
     # Check if we're in a Vercel-like environment
-    is_vercel = os.getenv('VERCEL') or os.getenv('AWS_LAMBDA_FUNCTION_NAME')
+    is_vercel = env_cache.get('VERCEL') or env_cache.get('AWS_LAMBDA_FUNCTION_NAME')
     print(f"🌐 Environment: {'Vercel/Serverless' if is_vercel else 'Local'}")
     print()
     
     # Check email environment variables
-    smtp_email = os.getenv('SMTP_EMAIL')
-    smtp_password = os.getenv('SMTP_PASSWORD')
+    smtp_email = env_cache.get('SMTP_EMAIL')
+    smtp_password = env_cache.get('SMTP_PASSWORD')
     
     print("📧 Email Configuration:")
     print(f"   SMTP_EMAIL: {'✅ Set' if smtp_email else '❌ Missing'}")
@@ -33,8 +32,8 @@ def test_vercel_env():
     
     # Test email service initialization
     try:
-        from email_service import EmailService
-        email_service = EmailService()
+        from _fixtures import get_email_service
+        email_service = get_email_service()
         
         print("🔧 EmailService Configuration:")
         print(f"   SMTP Server: {email_service.smtp_server}")
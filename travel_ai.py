@@ -3,45 +3,22 @@ Travel AI Service - Handles conversation and information extraction
 Steps 2 & 3: Text analysis and follow-up questions using GPT
 """
 
-import json
-from typing import Dict, Any, Optional
-from datetime import datetime, date
-import openai
-from models import TravelRequest
+import asyncio
+import orjson
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import cached_property
+from typing import Callable, Dict, Any, Iterator, List, Optional, Sequence, Tuple
+from datetime import date, timedelta
+from models import TravelRequest, CITY_CODES
 from config import config
 
-
-class TravelAI:
-    """AI service for travel conversation and information extraction"""
-    
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=config.get_openai_api_key())
-        self.model = config.get('openai.model', 'gpt-3.5-turbo')
-        self.temperature = config.get('openai.temperature', 0.1)
-    
-    def extract_travel_info(self, user_message: str, current_request: Optional[TravelRequest] = None) -> Dict[str, Any]:
-        """
-        Step 2: Extract travel information from user message
-        Step 3: Generate follow-up questions if information is missing
-        """
-        
-        # Prepare current context
-        current_info = {}
-        if current_request:
-            current_info = {
-                "origin": current_request.origin,
-                "destination": current_request.destination,
-                "departure_date": current_request.departure_date.isoformat() if current_request.departure_date else None,
-                "return_date": current_request.return_date.isoformat() if current_request.return_date else None,
-                "duration_days": current_request.duration_days,
-                "passengers": current_request.passengers,
-                "budget": current_request.budget,
-                "user_email": current_request.user_email
-            }
-        
-        system_prompt = f"""You are a travel booking assistant. Extract travel information from user messages and ask follow-up questions when needed.
-
-Current trip information: {json.dumps(current_info, indent=2)}
+# Instructions and response schema never change between calls, so they're built once as their
+# own message; only the short context message after it is filled in per call
+_SYSTEM_PROMPT_PREFIX = """You are a travel booking assistant. Extract travel information from user messages and ask follow-up questions when needed.
 
 From the user's message, extract:
 1. origin (departure city)
@@ -60,127 +37,609 @@ Rules:
 - If return date is mentioned but no duration, calculate duration_days
 - Don't make assumptions about missing information
 
-Respond with JSON in this exact format:
-{{
-  "extracted_info": {{
-    "origin": "city name or null",
-    "destination": "city name or null", 
-    "departure_date": "YYYY-MM-DD or null",
-    "return_date": "YYYY-MM-DD or null",
-    "duration_days": number or null,
-    "passengers": number or null,
-    "budget": number or null,
-    "user_email": "email or null"
-  }},
-  "is_complete": true/false,
-  "missing_fields": ["field1", "field2"],
-  "follow_up_question": "question to ask user or null",
-  "confidence": 0.0-1.0
-}}
+Return JSON: {extracted_info:{origin,destination,departure_date,return_date,duration_days,passengers,budget,user_email}, is_complete, missing_fields, follow_up_question, confidence (0.0-1.0)}. Use null for unknown."""
+
+def _parse_date(value: str) -> Optional[date]:
+    """YYYY-MM-DD to a date, None if it isn't one"""
+    try:
+        return date.fromisoformat(value)
+    except (ValueError, TypeError):
+        return None
+
 
-Today's date: {date.today().isoformat()}"""
+# How each extracted_info field is turned into a TravelRequest value
+_FIELD_PARSERS: Dict[str, Callable[[Any], Any]] = {
+    "origin": str,
+    "destination": str,
+    "departure_date": _parse_date,
+    "return_date": _parse_date,
+    "duration_days": int,
+    "passengers": int,
+    "budget": float,
+    "user_email": str
+}
 
+# Fast path: follow-up answers that are just an email, a date, a headcount, a budget or a city
+_EMAIL_RE = re.compile(r'([\w.+-]+@[\w-]+\.[\w-]+(?:\.[\w-]+)*)')
+_DATE_RE = re.compile(r'\b(\d{4}-\d{2}-\d{2})\b')
+_PAX_RE = re.compile(r'\b(\d+)\s+(?:people|persons|adults|travell?ers|pax|passengers?)\b', re.I)
+_BUDGET_RE = re.compile(r'(\d+)\s*(?:€|eur(?:os?)?\b)', re.I)
+_FAST_PATTERNS = (
+    ("user_email", _EMAIL_RE, str),
+    ("departure_date", _DATE_RE, str),
+    ("passengers", _PAX_RE, int),
+    ("budget", _BUDGET_RE, float)
+)
+_WORD_RE = re.compile(r"[^\s,.!?;:]+")
+# Words that can surround a plain answer without changing its meaning - anything else goes to the model
+_FILLER_WORDS = frozenset((
+    "a", "about", "address", "and", "are", "around", "be", "budget", "date", "e-mail", "email", "for", "here",
+    "i", "is", "it", "it's", "its", "leaving", "mail", "max", "maximum", "my", "ok", "okay", "on", "our",
+    "please", "sure", "thank", "thanks", "the", "there", "total", "up", "we", "we're", "will", "yes", "you"
+))
+
+# Follow-up question for each required field, most important first
+_QUESTION_PRIORITY = (
+    ("origin", "Where would you like to travel from?"),
+    ("destination", "Where would you like to go?"),
+    ("departure_date", "When would you like to depart?"),
+    ("user_email", "What's your email address so I can send you the booking details?")
+)
+
+class _StreamParser:
+    """
+    Incremental reader for the model's streamed JSON reply
+    feed() yields ("text_delta", str) while the follow_up_question value is being written and
+    ("stream_end", dict) once the top-level object closes; everything else is only buffered
+    """
+    AWAITING_KEY, AWAITING_VALUE_FOLLOWUP, IN_FOLLOWUP_STRING, IN_OTHER, DONE = range(5)
+    
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+    
+    def __init__(self):
+        self.state = self.AWAITING_KEY
+        self.text = ""
+        self._depth = 0
+        self._start = None       # Offset of the top-level '{'
+        self._in_string = False  # Inside a string other than the follow-up value
+        self._escape = ""        # Escape sequence read so far
+        self._surrogate = ""     # High half of a \u surrogate pair
+        self._key = None         # Characters of the top-level key being read
+        self._last_key = None
+    
+    def feed(self, chunk: str) -> Iterator[Tuple[str, Any]]:
+        """Consume the next piece of content"""
+        offset = len(self.text)
+        self.text += chunk
+        delta = []
+        
+        for i, ch in enumerate(chunk):
+            if self.state == self.DONE:
+                break
+            
+            if self.state == self.IN_FOLLOWUP_STRING:
+                if self._escape:
+                    self._escape += ch
+                    if self._escape[1] != "u":
+                        delta.append(self._ESCAPES.get(ch, ch))
+                        self._escape = ""
+                    elif len(self._escape) == 6:
+                        delta.append(self._decode_unicode(self._escape))
+                        self._escape = ""
+                elif ch == "\\":
+                    self._escape = ch
+                elif ch == '"':
+                    self.state = self.IN_OTHER
+                else:
+                    delta.append(ch)
+                continue
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = ""
+                elif ch == "\\":
+                    self._escape = ch
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key is not None:
+                        self._last_key = "".join(self._key)
+                        self._key = None
+                elif self._key is not None:
+                    self._key.append(ch)
+                continue
+            
+            # Anything before the object starts (fences, prose) is ignored
+            if self._depth == 0 and ch != "{":
+                continue
+            
+            if ch == '"':
+                if self.state == self.AWAITING_VALUE_FOLLOWUP:
+                    self.state = self.IN_FOLLOWUP_STRING
+                    continue
+                self._in_string = True
+                if self.state == self.AWAITING_KEY and self._depth == 1:
+                    self._key = []
+            elif ch == ":" and self._depth == 1 and self.state == self.AWAITING_KEY:
+                self.state = self.AWAITING_VALUE_FOLLOWUP if self._last_key == "follow_up_question" else self.IN_OTHER
+            elif ch in "{[":
+                if self._depth == 0:
+                    self._start = offset + i
+                elif self.state == self.AWAITING_VALUE_FOLLOWUP:
+                    self.state = self.IN_OTHER
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.state = self.DONE
+                    end = offset + i + 1
+            elif ch == "," and self._depth == 1:
+                self.state = self.AWAITING_KEY
+            elif self.state == self.AWAITING_VALUE_FOLLOWUP and not ch.isspace():
+                self.state = self.IN_OTHER  # null
+        
+        if delta:
+            yield "text_delta", "".join(delta)
+        if self.state == self.DONE and self._start is not None:
+            yield "stream_end", orjson.loads(self.text[self._start:end])
+            self._start = None
+    
+    def _decode_unicode(self, escape: str) -> str:
+        """Decode one \\uXXXX escape, pairing up UTF-16 surrogates"""
+        code = int(escape[2:], 16)
+        if 0xD800 <= code < 0xDC00:
+            self._surrogate = escape
+            return ""
+        if 0xDC00 <= code < 0xE000 and self._surrogate:
+            high, self._surrogate = int(self._surrogate[2:], 16), ""
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+        return chr(code)
+
+
+class TravelAI:
+    """AI service for travel conversation and information extraction"""
+    
+    # Starting point for a new conversation - only ever copied, never handed out or mutated
+    _EMPTY_REQUEST = TravelRequest()
+    
+    # Per-call part of the system prompt, sent after _SYSTEM_PROMPT_PREFIX
+    _PROMPT_TEMPLATE = "Current trip information: {current}\n\nToday's date: {today}"
+    
+    def __init__(self):
+        self.model = config.get('openai.model', 'gpt-3.5-turbo')
+        self.temperature = config.get('openai.temperature', 0)
+        self.max_tokens = config.get('openai.max_tokens', 400)
+        # Same sampling settings for every call - the schema needs ~200 tokens and no creativity
+        self._completion_params = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "seed": 42,
+            "max_tokens": self.max_tokens,
+            "response_format": {"type": "json_object"}
+        }
+        self._today_cache = (None, None)  # (minute, ISO date)
+        # Recent model results, so a resent or retried message doesn't cost another call
+        self._cache = OrderedDict()
+        self._cache_size = 256
+        self._cache_lock = threading.Lock()
+    
+    @cached_property
+    def _openai(self):
+        """The openai SDK - a heavy import, deferred until the first call needs it"""
+        import openai
+        return openai
+    
+    # Clients are built on first use and reused for the life of the process, so every call
+    # goes over the same pool of kept-alive TLS connections.
+    # Retries are handled by _call_with_retry, so the SDK's own are turned off.
+    
+    @cached_property
+    def client(self):
+        """Shared sync OpenAI client"""
+        import httpx
+        return self._openai.OpenAI(
+            api_key=config.get_openai_api_key(),
+            max_retries=0,
+            http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60))
+        )
+    
+    @cached_property
+    def aclient(self):
+        """Shared async OpenAI client"""
+        import httpx
+        return self._openai.AsyncOpenAI(
+            api_key=config.get_openai_api_key(),
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60))
+        )
+    
+    def extract_travel_info(self, user_message: str, current_request: Optional[TravelRequest] = None) -> Dict[str, Any]:
+        """
+        Step 2: Extract travel information from user message
+        Step 3: Generate follow-up questions if information is missing
+        """
+        for event, payload in self.stream_travel_info(user_message, current_request):
+            if event == "result":
+                return payload
+        return self._fallback_result(current_request)
+    
+    def stream_travel_info(self, user_message: str, current_request: Optional[TravelRequest] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of extract_travel_info
+        Yields ("text_delta", str) pieces of the follow-up question as the model writes them,
+        then a single ("result", dict) with the same shape extract_travel_info returns
+        """
+        fast_result = self._fast_extract(user_message, current_request)
+        if fast_result is not None:
+            yield "result", fast_result
+            return
+        
+        cache_key = self._cache_key(user_message, current_request)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            if cached["follow_up_question"]:
+                yield "text_delta", cached["follow_up_question"]
+            yield "result", cached
+            return
+        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                temperature=self.temperature,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ]
-            )
+            stream = self._call_with_retry(self._build_messages(user_message, current_request), stream=True)
             
-            # Parse the JSON response
-            content = response.choices[0].message.content.strip()
-            if content.startswith('```json'):
-                content = content[7:-3].strip()
-            elif content.startswith('```'):
-                content = content[3:-3].strip()
+            parser = _StreamParser()
+            parsed = None
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                
+                # Surface the follow-up question as soon as its text starts arriving
+                for event, payload in parser.feed(delta):
+                    if event == "text_delta":
+                        yield event, payload
+                    else:
+                        parsed = payload
             
-            result = json.loads(content)
+            # The object never closed - let the full scan report what's wrong
+            if parsed is None:
+                parsed = self._extract_json(parser.text)
             
-            # Update current request with extracted info
-            updated_request = self._update_request(current_request or TravelRequest(), result["extracted_info"])
+            result = self._build_result(parsed, current_request)
+            self._cache_put(cache_key, result)
             
-            return {
-                "travel_request": updated_request,
-                "extracted_info": result["extracted_info"],
-                "is_complete": result.get("is_complete", False),
-                "follow_up_question": result.get("follow_up_question"),
-                "confidence": result.get("confidence", 0.8),
-                "missing_fields": result.get("missing_fields", [])
-            }
+        except Exception as e:
+            print(f"❌ AI extraction error: {e}")
+            result = self._fallback_result(current_request)
+        
+        yield "result", result
+    
+    async def extract_travel_info_async(self, user_message: str, current_request: Optional[TravelRequest] = None) -> Dict[str, Any]:
+        """extract_travel_info for async callers - waits on OpenAI without holding a thread"""
+        fast_result = self._fast_extract(user_message, current_request)
+        if fast_result is not None:
+            return fast_result
+        
+        cache_key = self._cache_key(user_message, current_request)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self._acall_with_retry(self._build_messages(user_message, current_request))
+            result = self._build_result(self._extract_json(response.choices[0].message.content), current_request)
+            self._cache_put(cache_key, result)
+            return result
             
         except Exception as e:
             print(f"❌ AI extraction error: {e}")
-            return {
-                "travel_request": current_request or TravelRequest(),
-                "is_complete": False,
-                "follow_up_question": "I'm sorry, I didn't understand that. Could you please tell me where you'd like to travel from and to?",
-                "confidence": 0.0,
-                "missing_fields": ["origin", "destination", "departure_date", "user_email"]
+            return self._fallback_result(current_request)
+    
+    def extract_many(self, messages: List[str], poll_interval: float = 30.0) -> List[Dict[str, Any]]:
+        """
+        Extract travel information from many standalone messages through the OpenAI Batch API
+        Meant for offline reprocessing of logged messages - batches are cheaper but can take hours
+        """
+        lines = []
+        for i, message in enumerate(messages):
+            lines.append(orjson.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    **self._completion_params,
+                    "messages": self._build_messages(message, None)
+                }
+            }))
+        
+        batch_file = self.client.files.create(file=("extract_many.jsonl", b"\n".join(lines)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        print(f"⏳ Submitted batch {batch.id} with {len(messages)} messages")
+        
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        results = [self._fallback_result(None) for _ in messages]
+        if batch.status != "completed" or not batch.output_file_id:
+            print(f"❌ Batch {batch.id} ended with status {batch.status}")
+            return results
+        
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = orjson.loads(line)
+                content = item["response"]["body"]["choices"][0]["message"]["content"]
+                results[int(item["custom_id"])] = self._build_result(self._extract_json(content), None)
+            except Exception as e:
+                print(f"❌ AI extraction error in batch {batch.id}: {e}")
+        
+        return results
+    
+    def _fast_extract(self, user_message: str, current_request: Optional[TravelRequest]) -> Optional[Dict[str, Any]]:
+        """
+        Answer without the model when the message plainly fills every missing required field
+        Returns None whenever there's anything in the message it can't account for, or when it
+        would overwrite a field that is already set
+        """
+        request = current_request or self._EMPTY_REQUEST
+        missing = request._scan_required()[1]
+        if not missing:
+            return None
+        
+        extracted = {}
+        rest = user_message
+        for field, pattern, convert in _FAST_PATTERNS:
+            match = pattern.search(rest)
+            if match:
+                extracted[field] = convert(match.group(1))
+                rest = f"{rest[:match.start()]} {rest[match.end():]}"
+        
+        if "departure_date" in extracted and _parse_date(extracted["departure_date"]) is None:
+            return None
+        
+        leftover = [w for w in _WORD_RE.findall(rest.lower()) if w not in _FILLER_WORDS]
+        if leftover:
+            # Whatever is left has to be a single known city, optionally with a direction
+            direction = leftover.pop(0) if leftover[0] in ("from", "to") else None
+            city = " ".join(leftover)
+            if city not in CITY_CODES:
+                return None
+            
+            field = {"from": "origin", "to": "destination"}.get(direction)
+            if field is None:
+                open_fields = [f for f in ("origin", "destination") if f in missing]
+                if len(open_fields) != 1:
+                    return None  # Can't tell which end of the trip it is
+                field = open_fields[0]
+            extracted[field] = city.upper() if len(city) <= 3 else city.title()
+        
+        # Changing something the user already gave us (a second date, a new city) needs the model
+        for field in extracted:
+            if field not in missing and getattr(request, field) != getattr(self._EMPTY_REQUEST, field):
+                return None
+        
+        if not all(field in extracted for field in missing):
+            return None
+        
+        return self._build_result({
+            "extracted_info": extracted,
+            "is_complete": True,
+            "missing_fields": [],
+            "follow_up_question": None,
+            "confidence": 1.0
+        }, current_request)
+    
+    def _cache_key(self, user_message: str, current_request: Optional[TravelRequest]) -> tuple:
+        """Normalised message plus everything the prompt says about the trip (and today's date)"""
+        request = current_request or self._EMPTY_REQUEST
+        return (
+            " ".join(user_message.lower().split()),
+            request.origin, request.destination, request.departure_date, request.return_date,
+            request.duration_days, request.passengers, request.budget, request.user_email,
+            self._today_iso()
+        )
+    
+    def _cache_get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Cached result for key, or None"""
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                return None
+            self._cache.move_to_end(key)
+        # Callers store and mutate the request, so hand out a copy
+        return {**cached, "travel_request": cached["travel_request"].model_copy()}
+    
+    def _cache_put(self, key: tuple, result: Dict[str, Any]):
+        """Remember a model result, dropping the least recently used one when full"""
+        with self._cache_lock:
+            self._cache[key] = {**result, "travel_request": result["travel_request"].model_copy()}
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+    
+    def _call_with_retry(self, messages: List[Dict[str, str]], attempts: int = 4, base: float = 0.25, **kwargs):
+        """chat.completions.create with exponential backoff on rate limits and transient failures"""
+        for attempt in range(attempts):
+            try:
+                return self.client.chat.completions.create(**self._completion_params, messages=messages, **kwargs)
+            except Exception as e:
+                if attempt == attempts - 1 or not self._is_transient(e):
+                    raise
+                print(f"⚠️ OpenAI call failed ({type(e).__name__}), retrying...")
+                time.sleep(base * 2 ** attempt + random.random() * 0.1)
+    
+    async def _acall_with_retry(self, messages: List[Dict[str, str]], attempts: int = 4, base: float = 0.25, **kwargs):
+        """Async twin of _call_with_retry"""
+        for attempt in range(attempts):
+            try:
+                return await self.aclient.chat.completions.create(**self._completion_params, messages=messages, **kwargs)
+            except Exception as e:
+                if attempt == attempts - 1 or not self._is_transient(e):
+                    raise
+                print(f"⚠️ OpenAI call failed ({type(e).__name__}), retrying...")
+                await asyncio.sleep(base * 2 ** attempt + random.random() * 0.1)
+    
+    def _is_transient(self, error: Exception) -> bool:
+        """Whether an OpenAI error is worth retrying (rate limits, timeouts, dropped connections, 5xx)"""
+        openai = self._openai
+        if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+    
+    def _build_messages(self, user_message: str, current_request: Optional[TravelRequest]) -> List[Dict[str, str]]:
+        """Chat messages for one extraction call"""
+        
+        # Prepare current context
+        current_info = {}
+        if current_request:
+            current_info = {
+                "origin": current_request.origin,
+                "destination": current_request.destination,
+                "departure_date": current_request.departure_date.isoformat() if current_request.departure_date else None,
+                "return_date": current_request.return_date.isoformat() if current_request.return_date else None,
+                "duration_days": current_request.duration_days,
+                "passengers": current_request.passengers,
+                "budget": current_request.budget,
+                "user_email": current_request.user_email
             }
+        
+        return [
+            {"role": "system", "content": _SYSTEM_PROMPT_PREFIX},
+            {"role": "system", "content": self._PROMPT_TEMPLATE.format(current=orjson.dumps(current_info).decode(), today=self._today_iso())},
+            {"role": "user", "content": user_message}
+        ]
+    
+    def _today_iso(self) -> str:
+        """Today's date as YYYY-MM-DD, looked up at most once a minute"""
+        minute = int(time.time() // 60)
+        cached_minute, today = self._today_cache
+        if cached_minute != minute:
+            today = date.today().isoformat()
+            self._today_cache = (minute, today)
+        return today
+    
+    @staticmethod
+    def _extract_json(text: str) -> Dict[str, Any]:
+        """Parse the outermost JSON object in text, ignoring code fences or prose around it"""
+        start = text.find("{")
+        if start == -1:
+            return orjson.loads(text)
+        
+        depth = 0
+        in_string = False
+        escaped = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return orjson.loads(text[start:i + 1])
+        
+        # Unbalanced - let json report where it broke
+        return orjson.loads(text[start:])
+    
+    def _build_result(self, result: Dict[str, Any], current_request: Optional[TravelRequest]) -> Dict[str, Any]:
+        """Merge a parsed model response into the request"""
+        
+        # Update current request with extracted info
+        updated_request = self._update_request(current_request or self._EMPTY_REQUEST, result["extracted_info"])
+        complete, missing = updated_request._scan_required()
+        
+        return {
+            "travel_request": updated_request,
+            "complete": complete,
+            "missing": missing,
+            "extracted_info": result["extracted_info"],
+            "is_complete": result.get("is_complete", False),
+            "follow_up_question": result.get("follow_up_question"),
+            "confidence": result.get("confidence", 0.8),
+            "missing_fields": result.get("missing_fields", [])
+        }
+    
+    @classmethod
+    def _fallback_result(cls, current_request: Optional[TravelRequest]) -> Dict[str, Any]:
+        """Result used when the model call or its output can't be used"""
+        travel_request = current_request or cls._EMPTY_REQUEST.model_copy()
+        return {
+            "travel_request": travel_request,
+            "complete": False,  # Never act on a message we couldn't read
+            "missing": travel_request._scan_required()[1],
+            "is_complete": False,
+            "follow_up_question": "I'm sorry, I didn't understand that. Could you please tell me where you'd like to travel from and to?",
+            "confidence": 0.0,
+            "missing_fields": ["origin", "destination", "departure_date", "user_email"]
+        }
     
     def _update_request(self, current_request: TravelRequest, extracted_info: Dict[str, Any]) -> TravelRequest:
         """Update travel request with extracted information"""
         
-        # Create a dict of current values
-        update_data = current_request.model_dump()
-        
-        # Update with extracted information (only if not None)
+        # Collect only the fields the model filled in, coerced to the model's types (unknown keys are ignored)
+        changes = {}
         for key, value in extracted_info.items():
+            parse = _FIELD_PARSERS.get(key)
+            if value is None or parse is None:
+                continue
+            try:
+                value = parse(value)
+            except (ValueError, TypeError):
+                continue
             if value is not None:
-                if key in ["departure_date", "return_date"] and isinstance(value, str):
-                    try:
-                        update_data[key] = datetime.strptime(value, "%Y-%m-%d").date()
-                    except ValueError:
-                        continue
-                else:
-                    update_data[key] = value
+                changes[key] = value
         
         # Calculate missing fields if possible
-        if update_data.get("departure_date") and update_data.get("duration_days") and not update_data.get("return_date"):
-            departure = update_data["departure_date"]
-            if isinstance(departure, str):
-                departure = datetime.strptime(departure, "%Y-%m-%d").date()
-            from datetime import timedelta
-            update_data["return_date"] = departure + timedelta(days=update_data["duration_days"])
-        
-        elif update_data.get("departure_date") and update_data.get("return_date") and not update_data.get("duration_days"):
-            departure = update_data["departure_date"]
-            return_date = update_data["return_date"]
-            if isinstance(departure, str):
-                departure = datetime.strptime(departure, "%Y-%m-%d").date()
-            if isinstance(return_date, str):
-                return_date = datetime.strptime(return_date, "%Y-%m-%d").date()
-            update_data["duration_days"] = (return_date - departure).days
-        
-        return TravelRequest(**update_data)
-    
-    def generate_follow_up_question(self, travel_request: TravelRequest) -> str:
+        departure = changes.get("departure_date", current_request.departure_date)
+        return_date = changes.get("return_date", current_request.return_date)
+        duration_days = changes.get("duration_days", current_request.duration_days)
+        if departure and duration_days and not return_date:
+            changes["return_date"] = departure + timedelta(days=duration_days)
+        
+        elif departure and return_date and not duration_days:
+            changes["duration_days"] = (return_date - departure).days
+        
+        # Unchanged fields are already validated - copy instead of rebuilding the model
+        return current_request.model_copy(update=changes)
+    
+    def generate_follow_up_question(self, travel_request: TravelRequest, missing: Optional[Sequence[str]] = None) -> str:
         """Generate a natural follow-up question for missing information"""
         
-        missing = travel_request.missing_fields()
+        if missing is None:
+            missing = travel_request._scan_required()[1]
         
         if not missing:
             return "Great! I have all the information I need. Let me search for the best options for you."
         
-        # Prioritize questions
-        if "origin" in missing:
-            return "Where would you like to travel from?"
-        elif "destination" in missing:
-            return "Where would you like to go?"
-        elif "departure_date" in missing:
-            return "When would you like to depart?"
-        elif "user_email" in missing:
-            return "What's your email address so I can send you the booking details?"
-        else:
-            # Ask about optional fields
-            if not travel_request.return_date and not travel_request.duration_days:
-                return "How long would you like to stay? (e.g., '3 days' or 'return on Friday')"
-            elif travel_request.passengers == 1:
-                return "How many travelers will there be?"
-            elif not travel_request.budget:
-                return "Do you have a budget in mind for this trip?"
-        
-        return "Is there anything else you'd like to specify for your trip?" 
\ No newline at end of file
+        # Required fields first, in priority order
+        for field, question in _QUESTION_PRIORITY:
+            if field in missing:
+                return question
+        
+        # Ask about optional fields
+        if not travel_request.return_date and not travel_request.duration_days:
+            return "How long would you like to stay? (e.g., '3 days' or 'return on Friday')"
+        elif travel_request.passengers == 1:
+            return "How many travelers will there be?"
+        elif not travel_request.budget:
+            return "Do you have a budget in mind for this trip?"
+        
+        return "Is there anything else you'd like to specify for your trip?"
+
+
+# Shared instance - use this rather than building a TravelAI per request
+travel_ai = TravelAI()